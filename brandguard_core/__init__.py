@@ -0,0 +1,7 @@
+"""
+BrandGuard AI - Ortak Çekirdek Paketi
+
+Servisler arasında paylaşılan iş mantığını içerir. Aynı makinede
+(co-located) çalışan servisler HTTP katmanına gitmeden bu modülleri
+doğrudan import ederek kullanabilir.
+"""
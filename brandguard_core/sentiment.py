@@ -0,0 +1,438 @@
+"""
+================================================================================
+BrandGuard AI - Sentiment Çekirdeği
+================================================================================
+Amaç: Sentiment analizi ve DynamoDB kayıt mantığını servisten bağımsız bir
+      kütüphane olarak sunar.
+
+Kullanım:
+  - sentiment_service: HTTP endpoint'leri bu fonksiyonları çağırır
+  - ingestion_service: INPROC_SENTIMENT açıkken analyze() fonksiyonunu
+    doğrudan çağırarak HTTP round-trip'ini (TCP + JSON + Pydantic) atlar
+================================================================================
+"""
+
+import asyncio
+from decimal import Decimal
+from functools import lru_cache
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import boto3
+from botocore.exceptions import BotoCoreError, NoCredentialsError, ClientError
+import logging
+import os
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB tablo adı (environment variable'dan alınabilir)
+DYNAMODB_TABLE_NAME = "brandguard-reviews"
+
+# VADER analyzer'ı lexicon'u bir kez yükler; tüm çağrılar paylaşır
+_VADER = SentimentIntensityAnalyzer()
+
+# Tekrarlanan yorumlar (spam, kalıp cümleler, retry) için sonuç önbelleği.
+# Bellek kullanımını sınırlamak için yalnızca kısa metinler önbelleğe alınır.
+SENTIMENT_CACHE_SIZE = 10_000
+SENTIMENT_CACHE_MAX_TEXT_LEN = 1024
+
+
+# ============================================================================
+# SENTIMENT ANALYSIS FONKSİYONLARI
+# ============================================================================
+
+
+def analyze_sentiment(text: str) -> tuple[str, float]:
+    """
+    VADER (vaderSentiment) kullanarak metnin duygu durumunu analiz eder.
+
+    VADER, POS tagging yapmadan kelimeleri sözlükten (lexicon) arar ve
+    kural tabanlı düzeltmelerle (olumsuzlama, büyük harf, ünlem vb.)
+    normalize edilmiş bir "compound" skoru hesaplar. TextBlob'a göre
+    istek başına çok daha az Python seviyesi iş yapar.
+
+    SENTIMENT_CACHE_MAX_TEXT_LEN karakterden kısa metinlerin sonuçları
+    LRU önbellekte tutulur; aynı metin tekrar geldiğinde yeniden hesaplanmaz.
+
+    Polarity Skoru (compound):
+        - -1.0: Çok negatif (örn: "terrible", "awful")
+        -  0.0: Nötr (örn: "okay", "fine")
+        - +1.0: Çok pozitif (örn: "excellent", "amazing")
+
+    Sentiment Kategorileri:
+        - CRITICAL: polarity < -0.1 (Kritik şikayetler, acil müdahale gerekir)
+        - NEUTRAL: -0.1 <= polarity <= 0.1 (Nötr yorumlar, risk yok)
+        - POSITIVE: polarity > 0.1 (Olumlu yorumlar, marka değeri artışı)
+
+    Args:
+        text (str): Analiz edilecek metin
+
+    Returns:
+        tuple[str, float]: (sentiment_label, polarity_score)
+            - sentiment_label: "CRITICAL", "NEUTRAL" veya "POSITIVE"
+            - polarity_score: -1.0 ile 1.0 arası float değer
+
+    Example:
+        >>> analyze_sentiment("This product is amazing!")
+        ('POSITIVE', 0.6239)
+
+        >>> analyze_sentiment("Terrible service, very disappointed")
+        ('CRITICAL', -0.7574)
+    """
+    if len(text) <= SENTIMENT_CACHE_MAX_TEXT_LEN:
+        label, polarity = _score_text_cached(text)
+    else:
+        label, polarity = _score_text(text)
+
+    logger.debug("Sentiment analysis: %s (score: %.3f)", label, polarity)
+    return label, polarity
+
+
+def _score_text(text: str) -> tuple[str, float]:
+    """
+    VADER compound skorunu hesaplar ve eşik değerlerine göre etiketler.
+
+    Args:
+        text (str): Analiz edilecek metin
+
+    Returns:
+        tuple[str, float]: (sentiment_label, polarity_score)
+    """
+    polarity = float(_VADER.polarity_scores(text)["compound"])
+
+    # Eşik değerlerine göre kategorilendirme
+    if polarity < -0.1:
+        label = "CRITICAL"
+    elif polarity > 0.1:
+        label = "POSITIVE"
+    else:
+        label = "NEUTRAL"
+
+    return label, polarity
+
+
+# Metnin kendisi anahtar olarak kullanılır (process başına önbellek)
+_score_text_cached = lru_cache(maxsize=SENTIMENT_CACHE_SIZE)(_score_text)
+
+
+# ============================================================================
+# ZAMAN DAMGASI
+# ============================================================================
+
+# Son üretilen damga (epoch mikrosaniye) ve o saniyenin
+# "YYYY-MM-DDTHH:MM:SS." öneki. Lock altında birlikte güncellenir.
+_ts_lock = threading.Lock()
+_ts_last_micros = 0
+_ts_prefix_cache = (-1, "")
+
+
+def utcnow_iso() -> str:
+    """
+    Şu anki UTC zamanını ISO 8601 formatında döner
+    (örn: "2024-05-01T12:34:56.789012+00:00").
+
+    datetime.now().isoformat() her çağrıda datetime nesnesi oluşturup
+    formatlar. Burada saniye kısmı (strftime) saniyede bir kez hesaplanıp
+    önbelleğe alınır; mikrosaniye kısmı tamsayı aritmetiği ile eklenir.
+
+    Damgalar process içinde kesin artan ve benzersizdir: saat son damgadan
+    ileri gitmemişse (aynı mikrosaniye) son damga + 1µs kullanılır. Böylece
+    brand + timestamp anahtarı sıkı döngülerde (örn. /analyze_batch) çakışmaz.
+    Benzersizlik process başınadır; farklı worker'lar aynı damgayı
+    üretebilir. DynamoDB'de process'ler arası çakışmayı önlemek için sort
+    key'e yazar kimliği eklenir (bkz. _to_dynamodb_item).
+
+    Returns:
+        str: ISO 8601 formatında UTC zaman damgası (mikrosaniye hassasiyetinde)
+    """
+    global _ts_last_micros, _ts_prefix_cache
+
+    with _ts_lock:
+        micros = time.time_ns() // 1000
+        if micros <= _ts_last_micros:
+            micros = _ts_last_micros + 1
+        _ts_last_micros = micros
+
+        seconds, micros_part = divmod(micros, 1_000_000)
+        cached_second, prefix = _ts_prefix_cache
+        if seconds != cached_second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S.", time.gmtime(seconds))
+            _ts_prefix_cache = (seconds, prefix)
+
+    return f"{prefix}{micros_part:06d}+00:00"
+
+
+# ============================================================================
+# DYNAMODB ENTEGRASYONU
+# ============================================================================
+
+# Bu process'in yazar kimliği: DynamoDB sort key'ine (timestamp) eklenir.
+# Farklı worker/container'lar aynı marka için aynı mikrosaniyede damga
+# üretirse PutItem/BatchWriteItem birini hatasız ezerdi; sonek bunu önler.
+# gunicorn --preload modülü fork'tan önce yüklediği için kimlik her
+# child process'te yeniden üretilir.
+_WRITER_ID = secrets.token_hex(4)
+
+
+def _reset_writer_id() -> None:
+    """Fork edilen child process için yeni yazar kimliği üretir."""
+    global _WRITER_ID
+    _WRITER_ID = secrets.token_hex(4)
+
+
+if hasattr(os, "register_at_fork"):  # Windows'ta fork yok
+    os.register_at_fork(after_in_child=_reset_writer_id)
+
+# Process genelinde tek boto3 Session: botocore servis modelleri (JSON) bu
+# Session'ın loader'ında bir kez yüklenip tüm thread'lerce paylaşılır.
+# Session thread-safe olmadığı için yalnızca lock altında kullanılır.
+_session = None
+_session_lock = threading.Lock()
+
+# Thread başına önbelleğe alınan DynamoDB Table nesneleri.
+# boto3 resource'ları thread-safe olmadığı için her thread paylaşılan
+# Session'dan kendi resource'unu bir kez oluşturur (modeller zaten yüklü).
+_thread_local = threading.local()
+
+
+def _get_table(table_name: str = DYNAMODB_TABLE_NAME):
+    """
+    Verilen tablo için önbellekteki boto3 Table nesnesini döner,
+    yoksa oluşturup önbelleğe alır.
+
+    Credentials environment variable'lardan otomatik alınır:
+    AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION
+
+    Args:
+        table_name (str): DynamoDB tablo adı
+
+    Returns:
+        DynamoDB Table resource nesnesi
+    """
+    global _session
+
+    tables = getattr(_thread_local, "tables", None)
+    if tables is None:
+        tables = _thread_local.tables = {}
+
+    table = tables.get(table_name)
+    if table is None:
+        with _session_lock:
+            if _session is None:
+                _session = boto3.session.Session()
+            dynamodb = _session.resource("dynamodb")
+        table = tables[table_name] = dynamodb.Table(table_name)
+    return table
+
+
+def _to_dynamodb_item(item: dict) -> dict:
+    """
+    Analiz sonucunu DynamoDB'ye yazılabilir item'a dönüştürür.
+
+    - boto3 resource serializer'ı float kabul etmez (TypeError); score
+      Decimal'e çevrilir. str() üzerinden çevrilir ki Decimal(float)'ın
+      ikili yuvarlama basamakları (0.62390000000000000568...) yazılmasın.
+    - timestamp'e yazar kimliği eklenir ("<ISO 8601>#<_WRITER_ID>").
+      Sabit uzunluklu ISO önek korunduğu için sort key sıralaması ve
+      begins_with/between sorguları zamana göre çalışmaya devam eder.
+
+    HTTP yanıtındaki sonuç değişmez: score float, timestamp saf ISO 8601.
+
+    Args:
+        item (dict): Analiz sonucu (SentimentResult ile aynı alanlar)
+
+    Returns:
+        dict: DynamoDB'ye yazılacak yeni item
+    """
+    return {
+        **item,
+        "score": Decimal(str(item["score"])),
+        "timestamp": f"{item['timestamp']}#{_WRITER_ID}",
+    }
+
+
+def save_batch_to_dynamodb(items: list[dict], table_name: str = DYNAMODB_TABLE_NAME) -> None:
+    """
+    Analiz sonuçlarını tek seferde AWS DynamoDB'ye kaydetmeye çalışır.
+
+    boto3 batch_writer() item'ları 25'lik BatchWriteItem çağrılarına böler
+    ve UnprocessedItems dönen item'ları otomatik olarak yeniden gönderir.
+    Böylece her item için ayrı bir put_item round-trip'i ödenmez. Item'lar
+    tekilleştirilmez: brand + timestamp anahtarı process içinde
+    utcnow_iso(), process'ler arasında yazar kimliği ile benzersizdir.
+
+    Graceful Degradation Pattern:
+        - AWS credentials varsa ve DynamoDB erişilebilirse: Gerçek kayıt yapar
+        - AWS credentials yoksa veya AWS hatası oluşursa: Mock save yapar (log)
+        - Bu sayede servis AWS olmadan da çalışabilir (development/testing)
+        - Serileştirme hataları (TypeError, örn. desteklenmeyen tip) kod
+          hatasıdır; mock save olarak gizlenmez, çağırana iletilir
+
+    DynamoDB Tablo Yapısı:
+        - Primary Key: brand (String)
+        - Sort Key: timestamp (String, "<ISO 8601>#<yazar kimliği>")
+        - Attributes: text, sentiment, score (Number)
+
+    Args:
+        items (list[dict]): DynamoDB'ye kaydedilecek item listesi
+        table_name (str): Hedef DynamoDB tablo adı
+    """
+    if not items:
+        return
+
+    try:
+        table = _get_table(table_name)
+
+        with table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=_to_dynamodb_item(item))
+
+        logger.debug("Successfully saved batch to DynamoDB: %d items", len(items))
+
+    except NoCredentialsError:
+        logger.warning("AWS credentials not found. Mock save: %d items", len(items))
+
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        logger.error("DynamoDB ClientError (%s): %s. Mock save: %d items", error_code, e, len(items))
+
+    except BotoCoreError as e:
+        logger.error("DynamoDB BotoCoreError: %s. Mock save: %d items", e, len(items))
+
+    except TypeError:
+        # Serileştirme hatası: AWS'siz çalışma durumu değil, kayıp veri
+        raise
+
+    except Exception as e:
+        logger.error("Unexpected error while saving batch to DynamoDB: %r. Mock save: %d items", e, len(items))
+
+
+# ============================================================================
+# DYNAMODB YAZMA KUYRUĞU
+# ============================================================================
+# Servisler lifespan'de asyncio.Queue(maxsize=WRITE_QUEUE_MAXSIZE) oluşturup
+# run_write_flusher görevini başlatır; istekler sonuçları kuyruğa ekler.
+
+# Bir BatchWriteItem çağrısındaki maksimum item sayısı (DynamoDB limiti: 25)
+WRITE_BATCH_SIZE = 25
+
+# İlk item geldikten sonra batch'in dolması için beklenecek maksimum süre (sn)
+WRITE_BATCH_MAX_WAIT = 0.2
+
+# Kuyruk kapasitesi: dolduğunda kuyruğa yazan istek bekler (backpressure)
+WRITE_QUEUE_MAXSIZE = int(os.getenv("WRITE_QUEUE_MAXSIZE", "1000"))
+
+# Flusher'a kapanış sinyali vermek için kuyruğa konan işaret
+WRITE_QUEUE_STOP = object()
+
+
+async def run_write_flusher(queue: asyncio.Queue) -> None:
+    """
+    Yazma kuyruğunu boşaltan arka plan görevi.
+
+    İlk item geldiğinde WRITE_BATCH_SIZE item birikene veya
+    WRITE_BATCH_MAX_WAIT süresi dolana kadar toplar, ardından batch'i
+    tek seferde DynamoDB'ye yazar. WRITE_QUEUE_STOP görüldüğünde elindeki
+    batch'i yazıp sonlanır.
+
+    Yazmalar sırayla yapılır; flusher aynı anda en fazla bir executor
+    thread'i kullanır, skorlama için kullanılan thread'leri doldurmaz.
+
+    Args:
+        queue (asyncio.Queue): Kaydedilecek item'ların kuyruğu
+    """
+    loop = asyncio.get_running_loop()
+    stopping = False
+
+    while not stopping:
+        item = await queue.get()
+        if item is WRITE_QUEUE_STOP:
+            break
+
+        batch = [item]
+        deadline = loop.time() + WRITE_BATCH_MAX_WAIT
+        while len(batch) < WRITE_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is WRITE_QUEUE_STOP:
+                stopping = True
+                break
+            batch.append(item)
+
+        # boto3 senkron olduğu için yazma thread'de yapılır. Beklenmeyen bir
+        # hata (örn. serileştirme) loglanır; flusher sonraki batch'lerle devam eder
+        try:
+            await asyncio.to_thread(save_batch_to_dynamodb, batch)
+        except Exception:
+            logger.exception("Failed to write batch to DynamoDB: %d items dropped", len(batch))
+
+
+# ============================================================================
+# ISINMA (WARMUP)
+# ============================================================================
+
+
+def warmup() -> None:
+    """
+    İlk isteğin ödeyeceği soğuk başlangıç maliyetini uygulama açılışında öder.
+
+    - VADER skorlama yolu bir kez çalıştırılır (önbelleğe yazılmadan)
+    - Paylaşılan boto3 Session oluşturulur ve DynamoDB servis modelleri
+      loader'ına yüklenir; lazy import edilen modüller de ilk istekten önce
+      yüklenir. Diğer thread'ler ilk kayıtta yalnızca bu Session'dan kendi
+      (hafif) resource'larını oluşturur, model yükleme maliyetini ödemez.
+
+    AWS ayarları eksikse (örn. region yok) hata loglanır, açılış engellenmez.
+    """
+    _score_text("warmup")
+
+    try:
+        _get_table()
+    except BotoCoreError as e:
+        logger.warning("DynamoDB warmup skipped: %s", e)
+
+
+# ============================================================================
+# KÜTÜPHANE GİRİŞ NOKTASI
+# ============================================================================
+
+
+def analyze(review: dict) -> dict:
+    """
+    Yorumu analiz eder ve zaman damgalı sonucu döner. Sentiment Service'in
+    /analyze ve /analyze_batch endpoint'leri ile ingestion_service'in
+    in-process modu bu fonksiyonu kullanır.
+
+    DynamoDB kaydı yapılmaz; çağıran taraf sonucu yazma kuyruğuna ekler
+    (bkz. run_write_flusher).
+
+    Args:
+        review (dict): Validasyondan geçmiş yorum verisi
+            {"brand": str, "text": str}
+
+    Returns:
+        dict: Analiz sonucu (SentimentResult ile aynı alanlar)
+            {
+                "brand": str,
+                "text": str,
+                "sentiment": "CRITICAL" | "NEUTRAL" | "POSITIVE",
+                "score": float,
+                "timestamp": str (ISO 8601 UTC)
+            }
+    """
+    sentiment_label, score = analyze_sentiment(review["text"])
+
+    result = {
+        "brand": review["brand"],
+        "text": review["text"],
+        "sentiment": sentiment_label,
+        "score": score,
+        "timestamp": utcnow_iso(),
+    }
+    return result
@@ -9,23 +9,32 @@ Amaç: Müşteri yorumlarını toplayıp Sentiment Analysis servisine yönlendir
 Mimari:
   - FastAPI tabanlı RESTful API
   - Pydantic ile veri validasyonu
-  - HTTPX ile asenkron servisler arası iletişim
+  - HTTPX ile asenkron servisler arası iletişim (kalıcı, connection pool'lu client)
   - CORS desteği ile frontend entegrasyonu
+  - INPROC_SENTIMENT açıkken sentiment analizi HTTP yerine in-process
+    (brandguard_core.sentiment) olarak çalıştırılır
 
 Yazar: [Öğrenci Adı]
 Tarih: 2024
 ================================================================================
 """
 
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, field_validator
+from fastapi.responses import Response
+from pydantic import BaseModel, StringConstraints
+from typing import Annotated
 import httpx
 import logging
+import orjson
+import os
 
-# Logging yapılandırması
+# Logging yapılandırması (LOG_LEVEL ile ayarlanır; production'da WARNING önerilir)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
-    level=logging.INFO,
+    level=LOG_LEVEL,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
@@ -34,6 +43,10 @@ logger = logging.getLogger(__name__)
 # PYDANTIC MODELLERİ
 # ============================================================================
 
+# Boşlukları temizlenmiş, boş olamayan string. Strip ve uzunluk kontrolü
+# Python validator yerine pydantic-core (Rust) tarafında yapılır.
+NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
 
 class Review(BaseModel):
     """
@@ -47,37 +60,96 @@ class Review(BaseModel):
         - brand ve text alanları boş olamaz
         - Başta/sonda boşluklar otomatik temizlenir
     """
-    brand: str
-    text: str
-
-    @field_validator("brand", "text")
-    @classmethod
-    def not_empty(cls, v: str) -> str:
-        """
-        Alan validasyonu: Boş string veya sadece boşluk kontrolü.
-        
-        Args:
-            v: Validasyon yapılacak string değer
-            
-        Returns:
-            str: Temizlenmiş (strip edilmiş) string
-            
-        Raises:
-            ValueError: Alan boş veya sadece boşluk içeriyorsa
-        """
-        if not v or not v.strip():
-            raise ValueError("Field cannot be empty")
-        return v.strip()
+    brand: NonEmptyStr
+    text: NonEmptyStr
 
 
 # ============================================================================
 # FASTAPI UYGULAMA
 # ============================================================================
 
+# Sentiment Service adresi (Docker Compose network üzerinden erişim)
+SENTIMENT_SERVICE_BASE_URL = "http://sentiment_service:8001"
+
+# Connection pool boyutu (aynı anda açık olabilecek maksimum bağlantı)
+SENTIMENT_MAX_CONNECTIONS = 100
+
+# Docker network içi (loopback benzeri) çağrılar için sıkı timeout'lar.
+# Takılan istekler pool slotlarını uzun süre tutmaz; hızlıca 503 döner.
+SENTIMENT_TIMEOUT = httpx.Timeout(connect=0.5, read=3.0, write=1.0, pool=1.0)
+
+# HTTP/2 (h2c, prior knowledge) ile tek bağlantı üzerinden multiplexing.
+# Sunucu tarafının cleartext HTTP/2 konuşması gerekir; aynı değişken
+# sentiment_service'i hypercorn ile başlatır (start.sh). Varsayılan: HTTP/1.1
+# Trade-off: httpx origin başına tek h2 bağlantısı açar ve tüm istekleri onun
+# üzerinde multiplex eder; her ingestion worker'ının trafiği tek bir hypercorn
+# worker'ına sabitlenir. Worker sayıları eşit değilse bazı sentiment
+# worker'ları boşta kalabilir. Çekirdek başına ölçekleme önemliyse HTTP/1.1
+# (bağlantılar worker'lar arasında dağılır) tercih edilmelidir.
+SENTIMENT_HTTP2 = os.getenv("SENTIMENT_HTTP2", "0").lower() in ("1", "true", "yes")
+
+# Aynı anda Sentiment Service'e gidebilecek maksimum istek sayısı.
+# Pool boyutunu aşmamalı; fazlası semaphore'da sırasını bekler.
+SENTIMENT_MAX_INFLIGHT = min(
+    int(os.getenv("SENTIMENT_MAX_INFLIGHT", "50")),
+    SENTIMENT_MAX_CONNECTIONS,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Uygulama yaşam döngüsü: Sentiment Service için tek bir AsyncClient
+    oluşturur ve kapanışta bağlantıları serbest bırakır.
+
+    Client her istekte yeniden oluşturulmadığı için TCP bağlantıları
+    keep-alive ile tekrar kullanılır (connection pooling). Semaphore ile
+    eşzamanlı downstream istek sayısı pool boyutunun altında tutulur.
+    SENTIMENT_HTTP2 açıksa istekler HTTP/2 ile tek bağlantıda multiplex edilir.
+    """
+    app.state.http = httpx.AsyncClient(
+        base_url=SENTIMENT_SERVICE_BASE_URL,
+        timeout=SENTIMENT_TIMEOUT,
+        # Transport verildiğinde client'ın limits/http2 ayarları yok sayılır,
+        # bu yüzden pool ayarları doğrudan transport'a verilir
+        transport=httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=SENTIMENT_MAX_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+            # http:// üzerinde HTTP/2 için HTTP/1.1 kapatılır (h2c prior knowledge)
+            http1=not SENTIMENT_HTTP2,
+            http2=SENTIMENT_HTTP2,
+            # Gizli retry yok: hata hızlıca 503 olarak döner
+            retries=0,
+        ),
+    )
+    app.state.sentiment_sem = asyncio.Semaphore(SENTIMENT_MAX_INFLIGHT)
+
+    flusher = None
+    if INPROC_SENTIMENT:
+        # İlk in-process isteğin soğuk başlangıç maliyetini açılışta öde
+        await asyncio.to_thread(inproc_sentiment.warmup)
+        # In-process sonuçlar sınırlı kuyruk üzerinden toplu olarak yazılır
+        app.state.write_q = asyncio.Queue(maxsize=inproc_sentiment.WRITE_QUEUE_MAXSIZE)
+        flusher = asyncio.create_task(inproc_sentiment.run_write_flusher(app.state.write_q))
+
+    try:
+        yield
+    finally:
+        if flusher is not None:
+            # Kuyrukta kalan DynamoDB kayıtları yazılmadan kapanma
+            await app.state.write_q.put(inproc_sentiment.WRITE_QUEUE_STOP)
+            await flusher
+        await app.state.http.aclose()
+
+
 app = FastAPI(
     title="BrandGuard AI - Ingestion Service",
     description="Müşteri yorumlarını toplayıp Sentiment Analysis servisine yönlendiren API Gateway",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS Middleware: Frontend uygulamalarının API'ye erişmesine izin verir
@@ -89,8 +161,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Sentiment Service URL'i (Docker Compose network üzerinden erişim)
-SENTIMENT_SERVICE_URL = "http://sentiment_service:8001/analyze"
+# Sentiment Service analiz endpoint'i (base_url'e göre göreli yol)
+SENTIMENT_ANALYZE_PATH = "/analyze"
+
+# Body orjson ile önceden encode edildiği için content-type elle verilir
+JSON_HEADERS = {"content-type": "application/json"}
+
+# Servisler aynı makinede çalışıyorsa sentiment mantığını doğrudan import et.
+# Kapalıyken (varsayılan) HTTP üzerinden Sentiment Service'e gidilir.
+INPROC_SENTIMENT = os.getenv("INPROC_SENTIMENT", "0").lower() in ("1", "true", "yes")
+
+if INPROC_SENTIMENT:
+    from brandguard_core import sentiment as inproc_sentiment
 
 
 # ============================================================================
@@ -99,21 +181,25 @@ SENTIMENT_SERVICE_URL = "http://sentiment_service:8001/analyze"
 
 
 @app.post("/submit")
-async def submit_review(review: Review) -> dict:
+async def submit_review(review: Review, request: Request) -> Response:
     """
     Müşteri yorumunu alır, validasyondan geçirir ve Sentiment Analysis
     servisine iletir. Gelen yanıtı olduğu gibi kullanıcıya döner.
     
     İş Akışı:
         1. Gelen veri Pydantic modeli ile otomatik validasyondan geçer
-        2. HTTPX ile asenkron olarak Sentiment Service'e POST isteği gönderilir
-        3. Sentiment Service'in yanıtı (sentiment, score, timestamp) aynen döndürülür
+        2. Paylaşılan HTTPX client ile asenkron olarak Sentiment Service'e
+           POST isteği gönderilir (bağlantılar pool'dan tekrar kullanılır).
+           INPROC_SENTIMENT açıksa analiz aynı process içinde yapılır.
+        3. Sentiment Service'in yanıtı (sentiment, score, timestamp) byte olarak
+           aynen döndürülür (JSON decode/encode yapılmaz)
     
     Args:
         review (Review): Validasyon yapılmış müşteri yorumu modeli
+        request (Request): Paylaşılan HTTP client'a (app.state.http) erişim için
         
     Returns:
-        dict: Sentiment Service'den gelen analiz sonucu
+        Response: Sentiment Service'den gelen analiz sonucu (JSON)
             {
                 "brand": str,
                 "text": str,
@@ -127,19 +213,38 @@ async def submit_review(review: Review) -> dict:
             - 503: Sentiment Service'e bağlanılamazsa
             - 422: Validasyon hatası (Pydantic otomatik döner)
     """
+    logger.debug("Review received: brand=%s", review.brand)
+
+    if INPROC_SENTIMENT:
+        # HTTP katmanını atla; bloklayan NLP işini thread'de çalıştır
+        result = await asyncio.to_thread(
+            inproc_sentiment.analyze,
+            {"brand": review.brand, "text": review.text},
+        )
+        # DynamoDB kaydı yazma kuyruğuna; yanıt DynamoDB RTT'sini beklemez.
+        # Kuyruk doluysa yer açılana kadar beklenir (backpressure)
+        await request.app.state.write_q.put(result)
+        logger.debug("Sentiment analysis completed in-process: brand=%s", review.brand)
+        return Response(content=orjson.dumps(result), media_type="application/json")
+
     try:
-        logger.info(f"Review received for brand: {review.brand}")
-        
-        # Sentiment Service'e asenkron HTTP isteği gönder
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                SENTIMENT_SERVICE_URL,
-                json=review.model_dump()
+        # Sentiment Service'e paylaşılan client üzerinden asenkron HTTP isteği gönder
+        # (eşzamanlı istek sayısı semaphore ile sınırlı)
+        async with request.app.state.sentiment_sem:
+            response = await request.app.state.http.post(
+                SENTIMENT_ANALYZE_PATH,
+                content=orjson.dumps({"brand": review.brand, "text": review.text}),
+                headers=JSON_HEADERS,
             )
-            response.raise_for_status()  # HTTP hata kodlarını kontrol et
+        response.raise_for_status()  # HTTP hata kodlarını kontrol et
             
-        logger.info(f"Sentiment analysis completed for brand: {review.brand}")
-        return response.json()
+        logger.debug("Sentiment analysis completed: brand=%s", review.brand)
+        # Upstream JSON zaten doğrulanmış; parse edip yeniden encode etmeden ilet
+        return Response(
+            content=response.content,
+            media_type="application/json",
+            status_code=response.status_code,
+        )
         
     except httpx.TimeoutException:
         logger.error("Timeout while connecting to Sentiment Service")
@@ -148,13 +253,13 @@ async def submit_review(review: Review) -> dict:
             detail="Sentiment Service is not responding. Please try again later."
         )
     except httpx.RequestError as e:
-        logger.error(f"Connection error to Sentiment Service: {e}")
+        logger.error("Connection error to Sentiment Service: %s", e)
         raise HTTPException(
             status_code=503,
             detail="Unable to connect to Sentiment Service. Please check service status."
         )
     except httpx.HTTPStatusError as e:
-        logger.error(f"Sentiment Service returned error: {e.response.status_code}")
+        logger.error("Sentiment Service returned error: %s", e.response.status_code)
         raise HTTPException(
             status_code=e.response.status_code,
             detail=f"Sentiment Service error: {e.response.text}"
@@ -180,11 +285,14 @@ async def health_check() -> dict:
 if __name__ == "__main__":
     import uvicorn
     
-    # Development modunda çalıştırma
+    # uvloop (libuv tabanlı event loop; kurulu değilse, örn. Windows'ta,
+    # asyncio) + httptools (C HTTP parser)
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        loop="auto",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "2")),
+        log_level=LOG_LEVEL.lower()
     )
@@ -9,26 +9,41 @@ Amaç: Müşteri yorumlarını NLP (Natural Language Processing) teknikleri ile
 
 Mimari:
   - FastAPI tabanlı RESTful API
-  - TextBlob kütüphanesi ile sentiment analysis
+  - VADER (vaderSentiment) ile sentiment analysis
   - AWS DynamoDB entegrasyonu (Boto3)
   - Graceful degradation: AWS credentials yoksa mock save yapar
+  - DynamoDB yazımları kuyruğa alınır ve arka planda BatchWriteItem ile
+    toplu olarak yazılır
+  - Analiz ve kayıt mantığı brandguard_core.sentiment modülünde
+    (ingestion_service tarafından in-process olarak da kullanılabilir)
 
 Yazar: [Öğrenci Adı]
 Tarih: 2024
 ================================================================================
 """
 
-from datetime import datetime, timezone
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, field_validator
-from textblob import TextBlob
-import boto3
-from botocore.exceptions import BotoCoreError, NoCredentialsError, ClientError
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel, StringConstraints
+from typing import Annotated
 import logging
+import orjson
+import os
 
-# Logging yapılandırması
+from brandguard_core.sentiment import (
+    WRITE_QUEUE_MAXSIZE,
+    WRITE_QUEUE_STOP,
+    analyze as analyze_review,
+    run_write_flusher,
+    warmup,
+)
+
+# Logging yapılandırması (LOG_LEVEL ile ayarlanır; production'da WARNING önerilir)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
-    level=logging.INFO,
+    level=LOG_LEVEL,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
@@ -37,6 +52,10 @@ logger = logging.getLogger(__name__)
 # PYDANTIC MODELLERİ
 # ============================================================================
 
+# Boşlukları temizlenmiş, boş olamayan string. Strip ve uzunluk kontrolü
+# Python validator yerine pydantic-core (Rust) tarafında yapılır.
+NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
 
 class Review(BaseModel):
     """
@@ -46,27 +65,8 @@ class Review(BaseModel):
         brand (str): Analiz edilecek marka adı
         text (str): Müşteri yorumu metni
     """
-    brand: str
-    text: str
-
-    @field_validator("brand", "text")
-    @classmethod
-    def not_empty(cls, v: str) -> str:
-        """
-        Alan validasyonu: Boş string kontrolü.
-        
-        Args:
-            v: Validasyon yapılacak string değer
-            
-        Returns:
-            str: Temizlenmiş string
-            
-        Raises:
-            ValueError: Alan boş veya sadece boşluk içeriyorsa
-        """
-        if not v or not v.strip():
-            raise ValueError("Field cannot be empty")
-        return v.strip()
+    brand: NonEmptyStr
+    text: NonEmptyStr
 
 
 class SentimentResult(BaseModel):
@@ -87,6 +87,33 @@ class SentimentResult(BaseModel):
     timestamp: str
 
 
+class ReviewBatch(BaseModel):
+    """
+    Toplu analiz için giriş veri modeli.
+    
+    Attributes:
+        reviews (list[Review]): Analiz edilecek müşteri yorumları
+    """
+    reviews: list[Review]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Uygulama yaşam döngüsü: VADER ve boto3'ü ısıtır, DynamoDB yazma
+    kuyruğunu ve flusher görevini başlatır. Kapanışta kuyrukta kalan
+    item'lar yazılmadan çıkılmaz.
+    """
+    await asyncio.to_thread(warmup)
+    app.state.write_q = asyncio.Queue(maxsize=WRITE_QUEUE_MAXSIZE)
+    flusher = asyncio.create_task(run_write_flusher(app.state.write_q))
+    try:
+        yield
+    finally:
+        await app.state.write_q.put(WRITE_QUEUE_STOP)
+        await flusher
+
+
 # ============================================================================
 # FASTAPI UYGULAMA
 # ============================================================================
@@ -94,160 +121,50 @@ class SentimentResult(BaseModel):
 app = FastAPI(
     title="BrandGuard AI - Sentiment Analysis Service",
     description="Müşteri yorumlarını NLP ile analiz eden ve DynamoDB'ye kaydeden servis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
-# DynamoDB tablo adı (environment variable'dan alınabilir)
-DYNAMODB_TABLE_NAME = "brandguard-reviews"
-
 
 # ============================================================================
-# SENTIMENT ANALYSIS FONKSİYONLARI
+# API ENDPOINT'LERİ
 # ============================================================================
 
 
-def analyze_sentiment(text: str) -> tuple[str, float]:
+def _json_response(payload) -> Response:
     """
-    TextBlob kütüphanesi kullanarak metnin duygu durumunu analiz eder.
-    
-    TextBlob, metni tokenize edip her kelime için önceden eğitilmiş
-    sentiment lexicon'larını kullanarak genel bir polarity skoru hesaplar.
-    
-    Polarity Skoru:
-        - -1.0: Çok negatif (örn: "terrible", "awful")
-        -  0.0: Nötr (örn: "okay", "fine")
-        - +1.0: Çok pozitif (örn: "excellent", "amazing")
-    
-    Sentiment Kategorileri:
-        - CRITICAL: polarity < -0.1 (Kritik şikayetler, acil müdahale gerekir)
-        - NEUTRAL: -0.1 <= polarity <= 0.1 (Nötr yorumlar, risk yok)
-        - POSITIVE: polarity > 0.1 (Olumlu yorumlar, marka değeri artışı)
-    
-    Args:
-        text (str): Analiz edilecek metin
-        
-    Returns:
-        tuple[str, float]: (sentiment_label, polarity_score)
-            - sentiment_label: "CRITICAL", "NEUTRAL" veya "POSITIVE"
-            - polarity_score: -1.0 ile 1.0 arası float değer
-            
-    Example:
-        >>> analyze_sentiment("This product is amazing!")
-        ('POSITIVE', 0.8)
-        
-        >>> analyze_sentiment("Terrible service, very disappointed")
-        ('CRITICAL', -0.6)
-    """
-    blob = TextBlob(text)
-    polarity = float(blob.sentiment.polarity)
-    
-    # Eşik değerlerine göre kategorilendirme
-    if polarity < -0.1:
-        label = "CRITICAL"
-    elif polarity > 0.1:
-        label = "POSITIVE"
-    else:
-        label = "NEUTRAL"
-    
-    logger.info(f"Sentiment analysis: {label} (score: {polarity:.3f})")
-    return label, polarity
-
-
-# ============================================================================
-# DYNAMODB ENTEGRASYONU
-# ============================================================================
+    Güvenilir (sunucunun kendi ürettiği) veriyi orjson ile encode ederek döner.
 
-
-def save_to_dynamodb(item: dict) -> None:
+    response_model yalnızca OpenAPI şeması için kullanılır; Response
+    döndürüldüğünde FastAPI yeniden validasyon ve jsonable_encoder
+    adımlarını atlar.
     """
-    Analiz sonucunu AWS DynamoDB'ye kaydetmeye çalışır.
-    
-    Graceful Degradation Pattern:
-        - AWS credentials varsa ve DynamoDB erişilebilirse: Gerçek kayıt yapar
-        - AWS credentials yoksa veya hata oluşursa: Mock save yapar (print)
-        - Bu sayede servis AWS olmadan da çalışabilir (development/testing)
-    
-    DynamoDB Tablo Yapısı:
-        - Primary Key: brand (String)
-        - Sort Key: timestamp (String)
-        - Attributes: text, sentiment, score
-    
-    Args:
-        item (dict): DynamoDB'ye kaydedilecek veri
-            {
-                "brand": str,
-                "text": str,
-                "sentiment": str,
-                "score": float,
-                "timestamp": str
-            }
-            
-    Note:
-        Production ortamında burada structured logging (CloudWatch, etc.)
-        kullanılmalıdır. Şu an basit print kullanılıyor.
-    """
-    try:
-        # Tablo adını item'dan çıkar (opsiyonel override için)
-        table_name = item.pop("_table_name", DYNAMODB_TABLE_NAME)
-        
-        # Boto3 ile DynamoDB resource oluştur
-        # Credentials environment variable'lardan otomatik alınır:
-        # AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_DEFAULT_REGION
-        dynamodb = boto3.resource("dynamodb")
-        table = dynamodb.Table(table_name)
-        
-        # Item'ı DynamoDB'ye yaz
-        table.put_item(Item=item)
-        
-        logger.info(f"Successfully saved to DynamoDB: {item.get('brand')}")
-        print(f"DynamoDB'ye yazıldı: {item.get('brand')}")
-        
-    except NoCredentialsError:
-        # AWS credentials bulunamadı (development ortamı)
-        logger.warning("AWS credentials not found. Using mock save.")
-        print(f"DynamoDB Mock Save: {item.get('brand')} | Reason: No AWS credentials")
-        
-    except ClientError as e:
-        # AWS API hatası (tablo yok, izin yok, vb.)
-        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
-        logger.error(f"DynamoDB ClientError ({error_code}): {e}")
-        print(f"DynamoDB Mock Save: {item.get('brand')} | Reason: {error_code}")
-        
-    except BotoCoreError as e:
-        # Boto3 core hatası (network, vb.)
-        logger.error(f"DynamoDB BotoCoreError: {e}")
-        print(f"DynamoDB Mock Save: {item.get('brand')} | Reason: {type(e).__name__}")
-        
-    except Exception as e:
-        # Beklenmeyen hatalar
-        logger.error(f"Unexpected error while saving to DynamoDB: {e}")
-        print(f"DynamoDB Mock Save: {item.get('brand')} | Reason: {type(e).__name__}")
-
-
-# ============================================================================
-# API ENDPOINT'LERİ
-# ============================================================================
+    return Response(content=orjson.dumps(payload), media_type="application/json")
 
 
 @app.post("/analyze", response_model=SentimentResult)
-async def analyze(review: Review) -> SentimentResult:
+async def analyze(review: Review, request: Request) -> Response:
     """
     Müşteri yorumunu alır, sentiment analizi yapar, DynamoDB'ye kaydeder
     ve sonucu JSON formatında döner.
     
     İş Akışı:
         1. Gelen veri Pydantic modeli ile validasyondan geçer
-        2. TextBlob ile sentiment analizi yapılır (polarity hesaplanır)
+        2. VADER ile sentiment analizi yapılır (compound polarity hesaplanır).
+           CPU-bound iş thread'de çalışır, diğer istekler beklemez
         3. Polarity skoruna göre kategori belirlenir (CRITICAL/NEUTRAL/POSITIVE)
         4. UTC timestamp oluşturulur
-        5. Sonuç DynamoDB'ye kaydedilmeye çalışılır (başarısız olursa mock save)
-        6. Sonuç JSON olarak döndürülür
+        5. Sonuç DynamoDB yazma kuyruğuna eklenir; arka plandaki flusher
+           kuyruğu BatchWriteItem ile toplu yazar (başarısız olursa mock save).
+           Kuyruk doluysa yer açılana kadar beklenir (backpressure)
+        6. Sonuç orjson ile encode edilip JSON olarak döndürülür
     
     Args:
         review (Review): Analiz edilecek müşteri yorumu
+        request (Request): Yazma kuyruğuna (app.state.write_q) erişim için
         
     Returns:
-        SentimentResult: Analiz sonucu
+        Response: Analiz sonucu (SentimentResult şemasında JSON)
             {
                 "brand": str,
                 "text": str,
@@ -260,37 +177,59 @@ async def analyze(review: Review) -> SentimentResult:
         HTTPException:
             - 422: Validasyon hatası (Pydantic otomatik döner)
     """
-    logger.info(f"Analyzing review for brand: {review.brand}")
+    logger.debug("Analyzing review: brand=%s", review.brand)
     
-    # Sentiment analizi yap
-    sentiment_label, score = analyze_sentiment(review.text)
+    # Sentiment analizi ve UTC timestamp (brandguard_core; CPU-bound iş
+    # event loop'u bloklamamak için thread'de). Alanlar SentimentResult ile aynı
+    result = await asyncio.to_thread(
+        analyze_review, {"brand": review.brand, "text": review.text}
+    )
     
-    # UTC timestamp oluştur (ISO 8601 formatında)
-    timestamp = datetime.now(timezone.utc).isoformat()
+    # DynamoDB yazma kuyruğuna ekle (flusher toplu olarak kaydeder)
+    await request.app.state.write_q.put(result)
     
-    # Sonuç modelini oluştur
-    result = SentimentResult(
-        brand=review.brand,
-        text=review.text,
-        sentiment=sentiment_label,
-        score=score,
-        timestamp=timestamp,
-    )
+    logger.debug("Analysis completed: brand=%s sentiment=%s", review.brand, result["sentiment"])
+    return _json_response(result)
+
+
+@app.post("/analyze_batch", response_model=list[SentimentResult])
+async def analyze_batch(batch: ReviewBatch, request: Request) -> Response:
+    """
+    Birden fazla müşteri yorumunu tek istekte analiz eder ve sonuçları
+    DynamoDB'ye toplu olarak kaydeder.
+    
+    Tek tek /analyze çağrısına göre HTTP, Pydantic ve DynamoDB maliyeti
+    yorum başına değil istek başına ödenir: N yorum için tek HTTP isteği
+    ve N/25 BatchWriteItem çağrısı yapılır. Sonuçlar /analyze ile aynı
+    yazma kuyruğuna eklenir; yanıt DynamoDB yazımını beklemez.
     
-    # DynamoDB'ye kaydet (veya mock save)
-    save_to_dynamodb(
-        {
-            "_table_name": DYNAMODB_TABLE_NAME,  # Opsiyonel override için
-            "brand": result.brand,
-            "text": result.text,
-            "sentiment": result.sentiment,
-            "score": result.score,
-            "timestamp": result.timestamp,
-        }
+    Args:
+        batch (ReviewBatch): Analiz edilecek yorum listesi
+        request (Request): Yazma kuyruğuna (app.state.write_q) erişim için
+        
+    Returns:
+        Response: Her yorum için analiz sonucu (giriş sırasıyla,
+            list[SentimentResult] şemasında JSON)
+    """
+    logger.debug("Analyzing batch: %d reviews", len(batch.reviews))
+    
+    # Tüm batch tek bir thread çağrısında analiz edilir (yorum başına thread
+    # geçişi yok). Her sonuç process içinde benzersiz damga alır; aynı marka
+    # için bile brand + timestamp anahtarı batch içinde çakışmaz
+    results = await asyncio.to_thread(
+        lambda: [
+            analyze_review({"brand": review.brand, "text": review.text})
+            for review in batch.reviews
+        ]
     )
     
-    logger.info(f"Analysis completed for brand: {review.brand} - {sentiment_label}")
-    return result
+    # DynamoDB yazma kuyruğuna ekle; flusher 25'lik BatchWriteItem'larla yazar.
+    # Kuyruk doluysa yer açılana kadar beklenir (backpressure)
+    for result in results:
+        await request.app.state.write_q.put(result)
+    
+    logger.debug("Batch analysis completed: %d reviews", len(results))
+    return _json_response(results)
 
 
 @app.get("/health")
@@ -312,11 +251,14 @@ async def health_check() -> dict:
 if __name__ == "__main__":
     import uvicorn
     
-    # Development modunda çalıştırma
+    # uvloop (libuv tabanlı event loop; kurulu değilse, örn. Windows'ta,
+    # asyncio) + httptools (C HTTP parser)
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8001,
-        reload=True,
-        log_level="info"
+        loop="auto",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "2")),
+        log_level=LOG_LEVEL.lower()
     )
@@ -0,0 +1,26 @@
+#!/bin/sh
+# ============================================================================
+# BrandGuard AI - Sentiment Service başlatma betiği
+# ============================================================================
+# SENTIMENT_HTTP2 (ingestion_service ile aynı değişken) sunucuyu seçer:
+#   - kapalı (varsayılan): gunicorn + Uvicorn worker'ları (HTTP/1.1)
+#   - açık: hypercorn (cleartext HTTP/2 / h2c desteği). Not: her ingestion
+#     worker'ı tek h2 bağlantısı kullandığı için yük hypercorn worker'larına
+#     bağlantı başına dağılır (bkz. ingestion_service SENTIMENT_HTTP2)
+# Her iki modda da çekirdek sayısı kadar worker çalışır (WEB_CONCURRENCY).
+# ============================================================================
+
+WORKERS="${WEB_CONCURRENCY:-$(nproc)}"
+
+case "$(echo "${SENTIMENT_HTTP2:-0}" | tr '[:upper:]' '[:lower:]')" in
+    1|true|yes)
+        exec hypercorn main:app --bind 0.0.0.0:8001 \
+            --workers "$WORKERS" --worker-class uvloop
+        ;;
+    *)
+        # --preload: uygulama fork'tan önce yüklenir, modül seviyesindeki
+        # nesneler (VADER lexicon vb.) worker'lar arasında copy-on-write paylaşılır
+        exec gunicorn main:app -k uvicorn_worker.UvicornWorker \
+            -w "$WORKERS" -b 0.0.0.0:8001 --preload
+        ;;
+esac
@@ -0,0 +1,206 @@
+"""
+brandguard_core.sentiment testleri: zaman damgası benzersizliği, yazma
+kuyruğu flusher'ı ve DynamoDB batch kayıt yolu (botocore Stubber ile).
+"""
+
+import asyncio
+import threading
+from decimal import Decimal
+
+import pytest
+from botocore.stub import Stubber
+
+from brandguard_core import sentiment
+
+
+def _result(i: int, brand: str = "acme") -> dict:
+    return {
+        "brand": brand,
+        "text": f"review {i}",
+        "sentiment": "POSITIVE",
+        "score": 0.6239,
+        "timestamp": sentiment.utcnow_iso(),
+    }
+
+
+# ============================================================================
+# ZAMAN DAMGASI
+# ============================================================================
+
+
+def test_utcnow_iso_unique_and_increasing_under_threads():
+    per_thread = [[] for _ in range(4)]
+
+    def worker(stamps):
+        for _ in range(5000):
+            stamps.append(sentiment.utcnow_iso())
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in per_thread]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    all_stamps = [stamp for stamps in per_thread for stamp in stamps]
+    assert len(set(all_stamps)) == len(all_stamps)
+    for stamps in per_thread:
+        assert stamps == sorted(stamps)
+
+
+def test_utcnow_iso_format():
+    stamp = sentiment.utcnow_iso()
+    assert len(stamp) == len("2024-05-01T12:34:56.789012+00:00")
+    assert stamp[10] == "T" and stamp.endswith("+00:00")
+
+
+# ============================================================================
+# YAZMA KUYRUĞU (FLUSHER)
+# ============================================================================
+
+
+def _run_flusher(items, monkeypatch, save=None):
+    """Item'ları ve STOP işaretini kuyruğa koyup flusher'ı sonuna kadar çalıştırır."""
+    batches = []
+
+    def record(batch):
+        batches.append(list(batch))
+        if save is not None:
+            save(batch)
+
+    monkeypatch.setattr(sentiment, "save_batch_to_dynamodb", record)
+
+    async def main():
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+        queue.put_nowait(sentiment.WRITE_QUEUE_STOP)
+        await asyncio.wait_for(sentiment.run_write_flusher(queue), timeout=5)
+        assert queue.empty()
+
+    asyncio.run(main())
+    return batches
+
+
+def test_flusher_batches_at_most_25_and_drains_on_stop(monkeypatch):
+    items = [_result(i) for i in range(60)]
+
+    batches = _run_flusher(items, monkeypatch)
+
+    assert [len(b) for b in batches] == [25, 25, 10]
+    assert [item for b in batches for item in b] == items
+
+
+def test_flusher_stops_with_empty_queue(monkeypatch):
+    assert _run_flusher([], monkeypatch) == []
+
+
+def test_flusher_flushes_partial_batch_after_max_wait(monkeypatch):
+    batches = []
+    monkeypatch.setattr(sentiment, "save_batch_to_dynamodb", batches.append)
+
+    async def main():
+        queue = asyncio.Queue()
+        flusher = asyncio.create_task(sentiment.run_write_flusher(queue))
+        await queue.put(_result(0))
+        await asyncio.sleep(sentiment.WRITE_BATCH_MAX_WAIT * 3)
+        # STOP gelmeden, bekleme süresi dolunca yazılmış olmalı
+        assert len(batches) == 1
+        await queue.put(sentiment.WRITE_QUEUE_STOP)
+        await asyncio.wait_for(flusher, timeout=5)
+
+    asyncio.run(main())
+    assert [len(b) for b in batches] == [1]
+
+
+def test_flusher_continues_after_failed_batch(monkeypatch):
+    calls = []
+
+    def fail_first(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise TypeError("Float types are not supported.")
+
+    batches = _run_flusher([_result(i) for i in range(30)], monkeypatch, fail_first)
+
+    assert [len(b) for b in batches] == [25, 5]
+
+
+# ============================================================================
+# DYNAMODB BATCH KAYDI
+# ============================================================================
+
+
+@pytest.fixture
+def stubbed_table(monkeypatch):
+    """Gerçek serializer'dan geçen, ağ yerine Stubber'a giden DynamoDB tablosu."""
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "eu-central-1")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(sentiment, "_session", None)
+    monkeypatch.setattr(sentiment, "_thread_local", threading.local())
+
+    table = sentiment._get_table()
+    with Stubber(table.meta.client) as stubber:
+        yield stubber
+
+
+def test_save_batch_sends_decimal_score_and_writer_suffix(stubbed_table):
+    items = [_result(i) for i in range(3)]
+    expected = [
+        {
+            "PutRequest": {
+                "Item": {
+                    **item,
+                    "score": Decimal("0.6239"),
+                    "timestamp": f"{item['timestamp']}#{sentiment._WRITER_ID}",
+                }
+            }
+        }
+        for item in items
+    ]
+    stubbed_table.add_response(
+        "batch_write_item",
+        {"UnprocessedItems": {}},
+        {"RequestItems": {sentiment.DYNAMODB_TABLE_NAME: expected}},
+    )
+
+    sentiment.save_batch_to_dynamodb(items)
+    stubbed_table.assert_no_pending_responses()
+
+    # HTTP yanıtı için tutulan sonuçlar değişmez
+    assert all(isinstance(item["score"], float) for item in items)
+    assert all("#" not in item["timestamp"] for item in items)
+
+
+def test_save_batch_does_not_hide_serialization_errors(stubbed_table):
+    item = {**_result(0), "confidence": 0.5}
+    # Stubber parametreleri serializer'dan önce kontrol eder; yanıt
+    # kuyruğu boşsa çağrı serileştirmeye ulaşmadan StubResponseError olur.
+    # Serializer hata verdiği için bu yanıt hiç tüketilmez
+    stubbed_table.add_response("batch_write_item", {"UnprocessedItems": {}})
+
+    with pytest.raises(TypeError):
+        sentiment.save_batch_to_dynamodb([item])
+
+
+def test_save_batch_mock_saves_on_client_error(stubbed_table, caplog):
+    stubbed_table.add_client_error("batch_write_item", "ResourceNotFoundException")
+
+    sentiment.save_batch_to_dynamodb([_result(0)])
+
+    stubbed_table.assert_no_pending_responses()
+    assert "Mock save: 1 items" in caplog.text
+
+
+# ============================================================================
+# KÜTÜPHANE GİRİŞ NOKTASI
+# ============================================================================
+
+
+def test_analyze_returns_result_fields():
+    result = sentiment.analyze({"brand": "acme", "text": "This product is amazing!"})
+
+    assert result["brand"] == "acme"
+    assert result["sentiment"] == "POSITIVE"
+    assert isinstance(result["score"], float)
+    assert set(result) == {"brand", "text", "sentiment", "score", "timestamp"}